@@ -1,7 +1,8 @@
 import os
 import logging # Added logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base
 
 logger = logging.getLogger(__name__) # Added logger
@@ -17,20 +18,48 @@ DATABASE_URL = f"sqlite:///{os.path.join(DATABASE_DIR, 'kindle_insights.db')}"
 try:
     os.makedirs(DATABASE_DIR, exist_ok=True)
 except OSError as e:
-    logger.error(f"Failed to create database directory {DATABASE_DIR}: {e}", exc_info=True)
+    logger.error("Failed to create database directory %s: %s", DATABASE_DIR, e, exc_info=True)
     # Depending on requirements, you might want to exit or raise here
     raise
 
 # Create the SQLAlchemy engine
 # connect_args is needed for SQLite to enforce foreign key constraints and allow multi-threading access (FastAPI/Typer use)
+# StaticPool keeps one connection open for the life of the CLI process, so sessions reuse it
+# instead of reopening the .db/-wal/-shm files and re-running the PRAGMAs below each time
+# insertmanyvalues_page_size sets how many rows each multi-row INSERT ... RETURNING statement carries
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+    insertmanyvalues_page_size=1000,
     echo=False # Set echo=True to see SQL queries (useful for debugging)
 )
 
+# SQLite tuning applied to every new DBAPI connection.
+# WAL + synchronous=NORMAL avoids an fsync per transaction, the larger page cache and
+# mmap make lookups cheaper, and foreign_keys enforces the Clipping -> Book relationship.
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-64000", # Negative value is in KiB (~64 MB)
+    "mmap_size=268435456", # 256 MB
+    "foreign_keys=ON",
+)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+    finally:
+        cursor.close()
+
 # Create a SessionLocal class for database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False keeps loaded objects usable after a commit instead of
+# re-SELECTing each one on its next attribute access
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Create a Base class for declarative models
 Base = declarative_base()
@@ -46,14 +75,17 @@ def get_db():
 # Function to create all tables defined in models that inherit from Base
 def init_db():
     try:
-        logger.info(f"Initializing database schema at {DATABASE_URL}")
+        logger.info("Initializing database schema at %s", DATABASE_URL)
         # Import all models here before calling create_all
         # This ensures they are registered with the Base metadata
         from . import models # Relative import works here
+        from .migrations import run_migrations
         Base.metadata.create_all(bind=engine)
+        # Bring databases created by older versions up to date with the current models
+        run_migrations(engine)
         logger.info("Database schema initialized successfully.")
     except Exception as e:
-        logger.error(f"Failed to initialize database schema: {e}", exc_info=True)
+        logger.error("Failed to initialize database schema: %s", e, exc_info=True)
         raise # Re-raise the exception so the caller knows it failed
 
-logger.info(f"Database setup configured. Using database at: {DATABASE_URL}")
\ No newline at end of file
+logger.info("Database setup configured. Using database at: %s", DATABASE_URL)
\ No newline at end of file
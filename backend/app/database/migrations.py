@@ -0,0 +1,107 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.engine import Engine
+
+from app.parsing.parser import generate_content_hash, parse_location_range
+
+logger = logging.getLogger(__name__)
+
+# Rows re-hashed per UPDATE batch during content hash migration
+REHASH_BATCH_SIZE = 1000
+
+# Indexes replaced by newer model definitions, dropped from existing databases
+OBSOLETE_INDEXES = (
+    "ix_clippings_location", # Superseded by integer location_start
+    "ix_clipping_book_location", # Superseded by ix_clipping_book_location_start
+    "ix_clipping_book_hash", # Served the per-row duplicate probe, replaced by ON CONFLICT
+)
+
+def rehash_content_hashes(engine: Engine) -> int:
+    """
+    Re-hashes clippings whose content_hash is still a 64-char SHA-256 hex string
+    into the 16-byte BLAKE2b digest used by the parser. Safe to run repeatedly:
+    rows already holding a BLOB digest are skipped.
+    Returns the number of rows updated.
+    """
+    updated = 0
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, content FROM clippings WHERE typeof(content_hash) = 'text'"
+        )).all()
+        if not rows:
+            return 0
+
+        logger.info("Re-hashing %s clippings to BLAKE2b content hashes...", len(rows))
+        update_stmt = text("UPDATE clippings SET content_hash = :content_hash WHERE id = :id")
+        for start in range(0, len(rows), REHASH_BATCH_SIZE):
+            batch = [
+                {"id": clipping_id, "content_hash": generate_content_hash(content)}
+                for clipping_id, content in rows[start:start + REHASH_BATCH_SIZE]
+            ]
+            conn.execute(update_stmt, batch)
+            updated += len(batch)
+
+    logger.info("Re-hashed %s clippings.", updated)
+    return updated
+
+def add_location_range_columns(engine: Engine) -> int:
+    """
+    Adds the integer location_start/location_end columns to an existing clippings table
+    and backfills them from the string location, using the parser's own range parsing.
+    Returns the number of rows backfilled.
+    """
+    updated = 0
+    with engine.begin() as conn:
+        existing_columns = {row[1] for row in conn.execute(text("PRAGMA table_info(clippings)"))}
+        for column in ("location_start", "location_end"):
+            if column not in existing_columns:
+                logger.info("Adding column clippings.%s", column)
+                conn.execute(text(f"ALTER TABLE clippings ADD COLUMN {column} INTEGER"))
+
+        rows = conn.execute(text(
+            "SELECT id, location FROM clippings WHERE location IS NOT NULL AND location_start IS NULL"
+        )).all()
+        update_stmt = text(
+            "UPDATE clippings SET location_start = :location_start, location_end = :location_end WHERE id = :id"
+        )
+        for start in range(0, len(rows), REHASH_BATCH_SIZE):
+            batch = []
+            for clipping_id, location in rows[start:start + REHASH_BATCH_SIZE]:
+                location_start, location_end = parse_location_range(location)
+                batch.append({"id": clipping_id, "location_start": location_start, "location_end": location_end})
+            conn.execute(update_stmt, batch)
+            updated += len(batch)
+
+    if updated:
+        logger.info("Backfilled integer locations for %s clippings.", updated)
+    return updated
+
+def drop_obsolete_indexes(engine: Engine) -> None:
+    """Drops indexes that newer model definitions no longer declare."""
+    with engine.begin() as conn:
+        for index_name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+def create_missing_indexes(engine: Engine) -> None:
+    """
+    Creates indexes declared on the models that don't exist yet.
+    create_all skips tables that already exist, including their indexes,
+    so indexes added to a model later have to be created here.
+    Uses IF NOT EXISTS rather than checkfirst, which can't see expression indexes.
+    """
+    from .database import Base
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Applies in-place data/schema migrations for databases created by older versions.
+    Called from init_db after create_all, so every step must be idempotent.
+    """
+    rehash_content_hashes(engine)
+    add_location_range_columns(engine)
+    drop_obsolete_indexes(engine)
+    create_missing_indexes(engine)
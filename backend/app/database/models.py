@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint, Index, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint, Index, Float, ForeignKey, LargeBinary, text
 from sqlalchemy.orm import relationship
 
 # Import the Base class created in database.py
@@ -30,12 +30,15 @@ class Clipping(Base):
     # Foreign key linking to the books table
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
     clipping_type = Column(String, index=True, nullable=False) # Highlight, Note, Bookmark
-    location = Column(String, nullable=True, index=True) # Index location for sorting/lookup
+    location = Column(String, nullable=True) # Raw location as written by Kindle, e.g. '100-105'; part of the uniqueness signature
+    # Integer location range parsed from 'location', used for sorting and range queries
+    location_start = Column(Integer, nullable=True)
+    location_end = Column(Integer, nullable=True) # Null for single-location clippings
     page = Column(String, nullable=True) # Page number if available
     clipping_date = Column(DateTime, index=True, nullable=False) # Naive datetime
     content = Column(Text, nullable=True) # Allow null for bookmarks or empty highlights/notes
-    # SHA-256 hash for uniqueness check, including allowing null for bookmarks
-    content_hash = Column(String(64), index=True, nullable=True)
+    # 16-byte BLAKE2b digest for uniqueness check, including allowing null for bookmarks
+    content_hash = Column(LargeBinary(16), index=True, nullable=True)
 
     # Placeholder for future NLP features
     sentiment_score = Column(Float, nullable=True)
@@ -44,9 +47,22 @@ class Clipping(Base):
     __table_args__ = (
         # Index for sorting/querying clippings within a book by date or location
         Index('ix_clipping_book_date', 'book_id', 'clipping_date'),
-        Index('ix_clipping_book_location', 'book_id', 'location'),
-         # Unique constraint based on requirement (Book, Type, Location, ContentHash)
-        UniqueConstraint('book_id', 'clipping_type', 'location', 'content_hash', name='_clipping_uniqueness_uc'),
+        Index('ix_clipping_book_location_start', 'book_id', 'location_start'),
+        # Uniqueness requirement (Book, Type, Location, ContentHash). A plain UniqueConstraint
+        # treats NULLs as distinct, so bookmarks (no content_hash) and page-only clippings
+        # (no location) would never conflict. Coalescing NULLs makes the same signature unique
+        # for every clipping type, letting INSERT ... ON CONFLICT dedup them.
+        # Databases created before this index keep their old _clipping_uniqueness_uc as well;
+        # SQLite can't drop a table constraint without rebuilding the table, and this index
+        # is strictly stronger, so the old one never rejects a row this one accepts.
+        Index(
+            'ux_clipping_signature',
+            'book_id',
+            'clipping_type',
+            text("coalesce(location, '')"),
+            text("coalesce(content_hash, x'')"),
+            unique=True,
+        ),
     )
 
     # Relationship back to book (many clippings belong to one book)
@@ -54,4 +70,16 @@ class Clipping(Base):
 
     def __repr__(self):
         cont_prev = (self.content[:40] + '...') if self.content else 'N/A'
-        return f"<Clipping(id={self.id}, book_id={self.book_id}, type='{self.clipping_type}', loc='{self.location}', date='{self.clipping_date.strftime('%Y-%m-%d')}', content='{cont_prev}')>"
\ No newline at end of file
+        return f"<Clipping(id={self.id}, book_id={self.book_id}, type='{self.clipping_type}', loc='{self.location}', date='{self.clipping_date.strftime('%Y-%m-%d')}', content='{cont_prev}')>"
+
+class IngestState(Base):
+    __tablename__ = "ingest_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # SHA-1 of the first 4 KB of a clippings file, identifying the same (append-only) file across imports
+    file_fingerprint = Column(String(40), unique=True, nullable=False)
+    # Byte offset just past the last entry imported from this file
+    last_offset = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<IngestState(id={self.id}, fingerprint='{self.file_fingerprint[:12]}...', last_offset={self.last_offset})>"
@@ -14,6 +14,8 @@ from app.services import clipping_service # Import the service module
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+console = Console()
+
 # Create the Typer application
 cli_app = typer.Typer(help="Kindle Insights CLI - Manage your Kindle clippings.")
 
@@ -29,7 +31,7 @@ def get_db_session():
 @cli_app.command()
 def init():
     """
-    Initialize the db schema. Run once, initially
+    Initialize the db schema. Run once, initially, and again after upgrading to migrate existing data
     """
     typer.echo("Initializing database")
     try:
@@ -44,42 +46,75 @@ def ingest(
     filepath: Annotated[
         Path,
         typer.Argument(..., help="Path to the MyClippings.txt file.")
-    ]
+    ],
+    bulk: Annotated[
+        bool,
+        typer.Option("--bulk", help="Drop secondary indexes during the import and rebuild them afterwards. Faster for large first-time imports.")
+    ] = False,
+    full: Annotated[
+        bool,
+        typer.Option("--full", help="Parse the whole file, instead of only entries added since the last import of the same file.")
+    ] = False
 ):
     """
     Import clippings from a MyClippings.txt file into the database.
     """
     typer.echo(f"Starting ingestion process for: {filepath}")
-    db_session: Session = next(get_db_session())  # Get a DB session
 
+    # Bring a database created by an older version up to date before writing to it;
+    # the schema creation and migrations are idempotent, so this is a no-op when current
     try:
-        summary = clipping_service.import_clippings(db=db_session, file_path=str(filepath))  # Call service function
-        typer.echo("\n--- Import Summary ---")
-        typer.echo(f"Processed Entries: {summary['processed']}")
-        typer.secho(f"Added New:        {summary['added']}", fg=typer.colors.GREEN if summary['added'] > 0 else None)
-        typer.secho(f"Duplicates Found: {summary['duplicates']}", fg=typer.colors.YELLOW if summary['duplicates'] > 0 else None)
-        typer.secho(f"Errors Encountered:{summary['errors']}", fg=typer.colors.RED if summary['errors'] > 0 else None)
+        init_db()
     except Exception as e:
-        logger.error(f"An unexpected error occurred during ingestion: {e}", exc_info=True)
-        typer.secho(f"An unexpected error occurred during ingestion: {e}", fg=typer.colors.RED)
-    finally:
-        if db_session:
-            db_session.close()
+        typer.secho(f"Could not upgrade the database: {e}", fg=typer.colors.RED)
+        typer.secho("Run 'nova init' to upgrade the database, then retry the import.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    # One session for the whole import; the service writes in batches of
+    # clipping_service.IMPORT_BATCH_SIZE and commits once at the end.
+    with SessionLocal() as db_session:
+        try:
+            if bulk:
+                typer.echo("Bulk mode: dropping secondary indexes until the import finishes.")
+                clipping_service.drop_secondary_indexes(db_session)
+            summary = clipping_service.import_clippings(db=db_session, file_path=str(filepath), incremental=not full)  # Call service function
+            typer.echo("\n--- Import Summary ---")
+            typer.echo(f"Processed Entries: {summary['processed']}")
+            typer.secho(f"Added New:        {summary['added']}", fg=typer.colors.GREEN if summary['added'] > 0 else None)
+            typer.secho(f"Duplicates Found: {summary['duplicates']}", fg=typer.colors.YELLOW if summary['duplicates'] > 0 else None)
+            typer.secho(f"Errors Encountered:{summary['errors']}", fg=typer.colors.RED if summary['errors'] > 0 else None)
+        except Exception as e:
+            logger.error("An unexpected error occurred during ingestion: %s", e, exc_info=True)
+            typer.secho(f"An unexpected error occurred during ingestion: {e}", fg=typer.colors.RED)
+        finally:
+            # Always restore the indexes, even if the import failed part-way
+            if bulk:
+                db_session.rollback()
+                typer.echo("Rebuilding secondary indexes...")
+                clipping_service.create_secondary_indexes(db_session)
 
 
 @cli_app.command()
-def list_books():
-    """Lists all unique books in the library."""
+def list_books(
+    limit: Annotated[
+        int,
+        typer.Option("--limit", min=1, help="Maximum number of books to show.")
+    ] = 100,
+    offset: Annotated[
+        int,
+        typer.Option("--offset", min=0, help="Number of books to skip, for paging through a large library.")
+    ] = 0
+):
+    """Lists the unique books in the library, a page at a time."""
     typer.echo("Listing books...")
     db: Session = next(get_db_session())
-    books : List[models.Book] = [] 
     
     try:
-        books = clipping_service.list_books(db=db)
+        books = clipping_service.list_books(db=db, limit=limit, offset=offset)
         
         if not books:
             console.print("No books found in the library. Use 'ingest' to add clippings.")
-            raise typer.Exit(code=0)
+            return
         
         # Make nice table using Rich
         table = Table(title="Your Kindle Library", show_header=True, header_style="bold magenta")
@@ -92,9 +127,11 @@ def list_books():
             table.add_row(str(book.id), book.title, author_display)
             
         console.print(table)
+        if len(books) == limit:
+            console.print(f"Showing books {offset + 1} to {offset + len(books)}. Use --offset {offset + limit} for more.")
         
     except Exception as e:
-        logger.error(f"An unexpected error occurred while listing books: {e}", exc_info=True)
+        logger.error("An unexpected error occurred while listing books: %s", e, exc_info=True)
         console.print(f"[bold red]An unexpected error occurred while listing books: {e}[/]", style="red")
     finally:
         db.close()
@@ -1,8 +1,14 @@
+import os
 import re
+import mmap
 import hashlib
 import logging
+from collections import deque
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Iterable, Iterator, NamedTuple, Tuple
 from dateutil.parser import parse as parse_date
 from fuzzywuzzy import fuzz, process 
 
@@ -13,7 +19,8 @@ logger = logging.getLogger(__name__)
 
 # Line 1: Book title and author
 # Handles titles with or without parentheses, captures author if present
-LINE1_PATTERN = re.compile(r"^(.*?)(?:\s+\(([^)]+)\))?$")
+# Surrounding whitespace is consumed by the pattern so captures need no .strip()
+LINE1_PATTERN = re.compile(r"^\s*(.*?)(?:\s+\(\s*([^)]+?)\s*\))?\s*$")
 
 # Line 2: Metadata (Type, Page, Location, Date)
 # Revised LINE2_PATTERN (Place this in backend/app/parsing/parser.py)
@@ -30,10 +37,64 @@ LINE2_PATTERN = re.compile(
       # Option 2: Only Location is present
       r"(?:on\s+Location\s+([\d\-]+))" # Just Location (Group 4) - MUST have 'on' here based on samples
     r")" # End non-capturing group for metadata options
-    r"\s*\|\s*Added\s+on\s+(.*?)$" # Separator '|', 'Added on', and Date string (Group 5)
+    r"\s*\|\s*Added\s+on\s+(.*?)\s*$" # Separator '|', 'Added on', and Date string (Group 5)
 )
 
-DELIMITER = "=========="
+# Entry delimiter, matched against the raw bytes so delimiter lines are never decoded
+DELIMITER = b"=========="
+# A delimiter must fill its whole line (surrounding whitespace allowed), as in the line-based format
+DELIMITER_PATTERN = re.compile(rb"^[^\S\n]*" + re.escape(DELIMITER) + rb"[^\S\n]*$", re.MULTILINE)
+
+# Bytes at the start of a clippings file hashed to recognise it on later imports
+FINGERPRINT_SIZE = 4096
+
+# Clipping types that carry text content (bookmarks don't)
+CONTENT_CLIPPING_TYPES = frozenset(("Highlight", "Note"))
+
+# Byte ranges smaller than this (roughly 2000 entries) are parsed in-process;
+# below it, worker start-up costs more than it saves
+PARALLEL_PARSE_MIN_BYTES = 512 * 1024
+# Entries sent to a worker process per task
+PARALLEL_PARSE_CHUNKSIZE = 64
+# Tasks queued per worker process; bounds how much of the file is held in memory while parsing
+PARALLEL_PARSE_TASKS_PER_WORKER = 4
+
+# Kindle 'Added on' dates in either field order, with a 12- or 24-hour clock:
+#   Sunday, March 30, 2025 10:00:00 AM  /  Monday, 31 March 2025 23:15:30
+KINDLE_DATE_PATTERN = re.compile(
+    r"^[A-Za-z]+,\s+" # Weekday (ignored)
+    r"(?:(?P<month_first>[A-Za-z]+)\s+(?P<day_second>\d{1,2}),|(?P<day_first>\d{1,2})\s+(?P<month_second>[A-Za-z]+))"
+    r"\s+(?P<year>\d{4})\s+(?P<hour>\d{1,2}):(?P<minute>\d{2}):(?P<second>\d{2})"
+    r"(?:\s*(?P<meridiem>[AaPp][Mm]))?$"
+)
+MONTH_NUMBERS = {
+    name: number for number, name in enumerate(
+        ("january", "february", "march", "april", "may", "june", "july",
+         "august", "september", "october", "november", "december"), start=1)
+}
+
+# Known 'Added on' date formats, tried when the pattern above doesn't match and before falling back to dateutil
+KINDLE_DATE_FORMATS = (
+    "%A, %B %d, %Y %I:%M:%S %p", # Sunday, March 30, 2025 10:00:00 AM
+    "%A, %d %B %Y %I:%M:%S %p", # Monday, 31 March 2025 11:15:30 PM
+    "%A, %d %B %Y %H:%M:%S", # Monday, 31 March 2025 23:15:30
+)
+
+class ParsedClipping(NamedTuple):
+    """
+    A single parsed clipping, as handed from the parser to the import service
+    A tuple subclass: no per-instance __dict__, cheap to pickle back from parser worker processes
+    """
+    book_title: str
+    author: Optional[str]
+    clipping_type: str
+    page: Optional[str]
+    location: Optional[str]
+    location_start: Optional[int]
+    location_end: Optional[int]
+    clipping_date: datetime
+    content: Optional[str]
+    content_hash: Optional[bytes]
 
 def normalize_author(author_string: Optional[str], existing_authors: Optional[List[str]] = None) -> Optional[str]:
     """
@@ -41,9 +102,17 @@ def normalize_author(author_string: Optional[str], existing_authors: Optional[Li
     Simple initial implementation: lowercase and strip whitespace
     TODO: Enhance with fuzzy matching or other techniques 
     """
-    if not author_string:
+    # Whitespace-only authors, e.g. 'Title ( )', count as no author
+    if not author_string or author_string.isspace():
         return None
-    
+    return _normalize_author_cached(author_string)
+
+@lru_cache(maxsize=8192)
+def _normalize_author_cached(author_string: str) -> str:
+    """
+    Cached normalization body for normalize_author
+    The same author repeats for every clipping of a book, so each distinct string is normalized once
+    """
     normalized = author_string.strip().lower()
     
     # Implement basic normalization now, use more advanced in service layer
@@ -60,64 +129,240 @@ def normalize_author(author_string: Optional[str], existing_authors: Optional[Li
     
     return normalized.title()
 
-def generate_content_hash(content: Optional[str]) -> Optional[str]:
+# Digest size in bytes for content hashes (stored as a 16-byte BLOB)
+CONTENT_HASH_SIZE = 16
+
+def generate_content_hash(content: Optional[str]) -> Optional[bytes]:
     """
     Generates a hash for the content to ensure uniqueness
+    Uses a raw 16-byte BLAKE2b digest: faster than SHA-256 and a quarter the index size of a hex string
+    Not memoized: content is almost always unique, so a cache would only add lookup cost and hold the strings
     """
     if content:
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=CONTENT_HASH_SIZE).digest()
     return None
 
-def parse_clippings_file(file_path: str) -> List[Dict[str, Any]]:
+def _datetime_from_match(date_match: re.Match) -> Optional[datetime]:
+    """
+    Converts a KINDLE_DATE_PATTERN match into a datetime, or None if the values are out of range
+    """
+    month = MONTH_NUMBERS.get((date_match.group("month_first") or date_match.group("month_second")).lower())
+    day = date_match.group("day_first") or date_match.group("day_second")
+    hour = int(date_match.group("hour"))
+    meridiem = date_match.group("meridiem")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+    if not month:
+        return None
+    try:
+        return datetime(int(date_match.group("year")), month, int(day), hour,
+                        int(date_match.group("minute")), int(date_match.group("second")))
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=4096)
+def parse_kindle_date(date_str: str) -> datetime:
+    """
+    Parses a Kindle 'Added on' date string into a naive datetime
+    Builds the datetime straight from KINDLE_DATE_PATTERN's groups, which avoids strptime's
+    per-call format parsing and locale lookups; strptime and then dateutil are fallbacks
+    Memoized since many clippings in a file share the same timestamp
+    """
+    date_match = KINDLE_DATE_PATTERN.match(date_str)
+    if date_match:
+        parsed = _datetime_from_match(date_match)
+        if parsed:
+            return parsed
+    for date_format in KINDLE_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            pass
+    return parse_date(date_str)
+
+def _frame_entries(buffer, start_offset: int = 0, end_offset: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    Splits the raw file contents between start_offset and end_offset into entry blocks at each delimiter line
+    Yields (end offset of the delimiter, raw entry bytes); the search runs in C over the buffer,
+    so Python only iterates once per entry. Text after the last delimiter is an incomplete entry and is ignored
+    """
+    if end_offset is None:
+        end_offset = len(buffer)
+    entry_start = start_offset
+    for delimiter_match in DELIMITER_PATTERN.finditer(buffer, start_offset, end_offset):
+        yield delimiter_match.end(), buffer[entry_start:delimiter_match.start()]
+        entry_start = delimiter_match.end()
+
+def file_fingerprint(file_path: str) -> str:
+    """
+    Identifies a clippings file across imports by the SHA-1 of its first FINGERPRINT_SIZE bytes
+    Kindle only appends to MyClippings.txt, so the head stays the same as the file grows
+    """
+    with open(file_path, 'rb') as file:
+        return hashlib.sha1(file.read(FINGERPRINT_SIZE)).hexdigest()
+
+def find_last_entry_end(file_path: str) -> int:
+    """
+    Returns the byte offset just past the last complete entry (its delimiter line), or 0 if there is none
+    Searches backwards from the end of the file, so only the tail is scanned
+    """
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            position = buffer.rfind(DELIMITER)
+            while position != -1:
+                # Only a delimiter that fills its whole line ends an entry
+                line_start = buffer.rfind(b"\n", 0, position) + 1
+                delimiter_match = DELIMITER_PATTERN.match(buffer, line_start)
+                if delimiter_match:
+                    return delimiter_match.end()
+                position = buffer.rfind(DELIMITER, 0, position)
+    return 0
+
+def parse_location_range(location: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Splits a Kindle location string into integer (start, end)
+    '100-105' -> (100, 105), '300' -> (300, None); unparseable values give (None, None)
+    Abbreviated ends like '1234-45' are expanded using the start's leading digits
+    """
+    if not location:
+        return None, None
+    start_str, _, end_str = location.partition('-')
+    try:
+        start = int(start_str)
+        if not end_str:
+            return start, None
+        end = int(end_str)
+    except ValueError:
+        return None, None
+    if end < start and len(end_str) < len(start_str):
+        end = int(start_str[:len(start_str) - len(end_str)] + end_str)
+    return start, end
+
+def parse_entry_bytes(entry_block: bytes, end_offset: int = 0) -> Optional[ParsedClipping]:
+    """
+    Parses one raw entry block as framed from the clippings file
+    Top-level (picklable) so it can run in worker processes; end_offset is only used in log messages
+    Returns None if the entry is incomplete or can't be parsed
+    """
+    try:
+        # One decode per entry, then split and strip in C on the decoded text
+        entry_text = entry_block.decode('utf-8')
+    except UnicodeDecodeError as e:
+        logger.error("Error decoding entry ending at byte %s: %s", end_offset, e, exc_info=False)
+        return None
+    entry_lines = [line for line in map(str.strip, entry_text.split("\n")) if line]
+    if len(entry_lines) < 2:
+        logger.warning("Skipped potentially incomplete entry ending at byte %s: %s", end_offset, entry_lines)
+        return None
+    try:
+        parsed_data = parse_entry(entry_lines)
+    except Exception as e:
+        logger.error("Error processing entry ending at byte %s: %s\nEntry lines: %s", end_offset, e, entry_lines, exc_info=False)
+        return None
+    if not parsed_data:
+        logger.warning("Skipped entry ending at byte %s", end_offset)
+    return parsed_data
+
+def _parse_entry_chunk(chunk: List[Tuple[int, bytes]]) -> List[Optional[ParsedClipping]]:
+    """
+    Parses a list of (end offset, entry block) pairs; the task run by each worker process
+    """
+    return [parse_entry_bytes(entry_block, end_offset) for end_offset, entry_block in chunk]
+
+def _parse_in_parallel(entries: Iterable[Tuple[int, bytes]], worker_count: int) -> Iterator[Optional[ParsedClipping]]:
+    """
+    Parses (end offset, entry block) pairs across a process pool and yields the results in file order
+    Entries are read from the iterable only as tasks are submitted, with at most
+    PARALLEL_PARSE_TASKS_PER_WORKER tasks queued per worker, so memory stays bounded on any file size
+    """
+    entries = iter(entries)
+    max_pending = worker_count * PARALLEL_PARSE_TASKS_PER_WORKER
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=worker_count) as executor:
+        while chunk := list(islice(entries, PARALLEL_PARSE_CHUNKSIZE)):
+            pending.append(executor.submit(_parse_entry_chunk, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def iter_clippings(file_path: str, start_offset: int = 0, end_offset: Optional[int] = None) -> Iterator[ParsedClipping]:
     """
-    Parses the clippings file and returns a list of dictionaries each representing a clipping
+    Parses the clippings file and yields a ParsedClipping for each clipping, in file order
+    Only entries between the byte offsets start_offset and end_offset are parsed, so an
+    import can resume after the entries it has already seen
+    The file is memory-mapped and framed into entries on the delimiter lines as parsing goes,
+    so only the entries being parsed are held in memory; large files are parsed across
+    CPU cores with a process pool, since entries are independent
+    Yielding lets the caller start writing clippings while the rest of the file is still being parsed
     """
-    parsed_clippings = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
+        file = open(file_path, 'rb')
     except FileNotFoundError:
-        logger.error(f"File not found at: {file_path}")
-        return []
+        logger.error("File not found at: %s", file_path)
+        return
     except Exception as e:
-        logger.error(f"Error reading file: {e}")
-        return []
-    
-    current_clipping_lines = []
-    entry_count = 0
-    processed_count = 0
-    skipped_count = 0
-    
-    for line_num, line in enumerate(lines):
-        line = line.strip()
-        if line == DELIMITER:
-            entry_count += 1
-            if len(current_clipping_lines) >= 2:
-                try:
-                    parsed_data = parse_entry(current_clipping_lines)
+        logger.error("Error reading file: %s", e)
+        return
+
+    with file:
+        file_size = os.fstat(file.fileno()).st_size
+        # mmap can't map an empty file, and there is nothing to parse anyway
+        if file_size == 0:
+            logger.warning("Clippings file is empty: %s", file_path)
+            return
+        if end_offset is None:
+            end_offset = file_size
+
+        entry_count = 0
+        non_blank_count = 0
+        def non_blank_entries(buffer) -> Iterator[Tuple[int, bytes]]:
+            # Blank blocks (e.g. back-to-back delimiters) are neither parsed nor counted as skipped
+            nonlocal entry_count, non_blank_count
+            for framed_entry in _frame_entries(buffer, start_offset, end_offset):
+                entry_count += 1
+                if framed_entry[1].strip():
+                    non_blank_count += 1
+                    yield framed_entry
+
+        processed_count = 0
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            entries = non_blank_entries(buffer)
+            worker_count = os.cpu_count() or 1
+            if worker_count > 1 and end_offset - start_offset >= PARALLEL_PARSE_MIN_BYTES:
+                logger.info("Parsing %s bytes across %s processes", end_offset - start_offset, worker_count)
+                parsed_entries = _parse_in_parallel(entries, worker_count)
+            else:
+                parsed_entries = (
+                    parse_entry_bytes(entry_block, entry_end) for entry_end, entry_block in entries
+                )
+            try:
+                for parsed_data in parsed_entries:
                     if parsed_data:
-                        parsed_clippings.append(parsed_data)
                         processed_count += 1
-                    else:
-                        skipped_count += 1
-                        logger.warning(f"Skipped entry ending near line {line_num + 1}")
-                except Exception as e:
-                    skipped_count += 1
-                    logger.error(f"Error processing entry ending near line {line_num + 1}: {e}\nEntry lines: {current_clipping_lines}", exc_info=False)
-            elif current_clipping_lines:
-                skipped_count += 1
-                logger.warning(f"Skipped potentially incomplete entry ending near line {line_num + 1}: {current_clipping_lines}")
-                
-            current_clipping_lines = []
-        elif line:
-            current_clipping_lines.append(line)
-            
-    logger.info(f"Parsing complete for {file_path}")
-    logger.info(f"Total entries: {entry_count}, Processed: {processed_count}, Skipped: {skipped_count}")
-    
-    return parsed_clippings
+                        yield parsed_data
+            finally:
+                # The delimiter scanner holds an export of the mmap until its generator is closed;
+                # close them first, or closing the mmap raises BufferError over any error in flight
+                parsed_entries.close()
+                entries.close()
+
+    skipped_count = non_blank_count - processed_count
+    logger.info("Parsing complete for %s", file_path)
+    logger.info("Total entries: %s, Processed: %s, Skipped: %s", entry_count, processed_count, skipped_count)
+
+def parse_clippings_file(file_path: str) -> List[ParsedClipping]:
+    """
+    Parses the clippings file and returns a list of ParsedClipping records
+    See iter_clippings for a streaming version
+    """
+    return list(iter_clippings(file_path))
 
-def parse_entry(entry_lines: List[str]) -> Optional[Dict[str, Any]]:
+def parse_entry(entry_lines: List[str]) -> Optional[ParsedClipping]:
     """
     Parses a single entry from the clippings file
     """
@@ -127,34 +372,32 @@ def parse_entry(entry_lines: List[str]) -> Optional[Dict[str, Any]]:
     # Line 1: Book title and author
     line1_match = LINE1_PATTERN.match(entry_lines[0])
     if not line1_match:
-        logger.warning(f"Line 1 format error: {entry_lines[0]}")
+        logger.warning("Line 1 format error: %s", entry_lines[0])
         return None
-    book_title = line1_match.group(1).strip()
-    raw_author = line1_match.group(2).strip() if line1_match.group(2) else None
+    # Captures are already trimmed by the patterns
+    book_title = line1_match.group(1)
+    raw_author = line1_match.group(2)
     normalized_author = normalize_author(raw_author)
     
     # Line 2: Metadata
     line2_match = LINE2_PATTERN.match(entry_lines[1])
     if not line2_match:
-        logger.warning(f"Line 2 format error: {entry_lines[1]}")
+        logger.warning("Line 2 format error: %s", entry_lines[1])
         return None
-    clipping_type = line2_match.group(1).strip()
-    page = line2_match.group(2).strip() if line2_match.group(2) else None
-    location = line2_match.group(3).strip() if line2_match.group(3) else None
-    location2 = line2_match.group(4).strip() if line2_match.group(4) else None
-    date_str = line2_match.group(5).strip()
+    clipping_type, page, location, location2, date_str = line2_match.groups()
     
     location= location if page else location2
+    location_start, location_end = parse_location_range(location)
     
     # Parse date -> naive date 
     try:
-        clipping_date = parse_date(date_str)
+        clipping_date = parse_kindle_date(date_str)
     except Exception as e:
-        logger.warning(f"Date parsing error: {date_str} - {e}")
+        logger.warning("Date parsing error: %s - %s", date_str, e)
         return None
     
     content = None
-    if clipping_type in ["Highlight", "Note"] and len(entry_lines) > 2:
+    if clipping_type in CONTENT_CLIPPING_TYPES and len(entry_lines) > 2:
         content = "\n".join(entry_lines[2:]).strip()
         if not content:
             content = None
@@ -162,16 +405,18 @@ def parse_entry(entry_lines: List[str]) -> Optional[Dict[str, Any]]:
     # Generate content hash
     content_hash = generate_content_hash(content)
     
-    return {
-        "book_title": book_title,
-        "author": normalized_author,
-        "clipping_type": clipping_type,
-        "page": page,
-        "location": location,
-        "clipping_date": clipping_date,
-        "content": content,
-        "content_hash": content_hash
-    }
+    return ParsedClipping(
+        book_title=book_title,
+        author=normalized_author,
+        clipping_type=clipping_type,
+        page=page,
+        location=location,
+        location_start=location_start,
+        location_end=location_end,
+        clipping_date=clipping_date,
+        content=content,
+        content_hash=content_hash
+    )
     
     
 # Example usage (for testing purposes)
@@ -216,7 +461,7 @@ Content for malformed metadata.
     if parsed_results:
         for i, clipping in enumerate(parsed_results):
             print(f"\nClipping {i+1}:")
-            for key, value in clipping.items():
+            for key, value in clipping._asdict().items():
                  # Format datetime for printing
                 if isinstance(value, datetime):
                     print(f"  {key}: {value.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -226,7 +471,6 @@ Content for malformed metadata.
         print("No clippings parsed.")
 
     # Clean up the dummy file
-    import os
     os.remove(dummy_file_path)
 
 
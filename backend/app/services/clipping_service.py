@@ -1,216 +1,388 @@
 import logging
-from typing import Dict, Optional, List # Added List import
+import queue
+import sys
+import threading
+from typing import Any, Dict, Iterable, Optional, List, Set, Tuple # Added List import
+from sqlalchemy import bindparam, func, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex, DropIndex
 
 # Import database models, session management, and parser function
 # Assuming Session is properly imported or managed by the caller (e.g., FastAPI dependency)
 from app.database import models # Use 'app' as the root package name
-from app.parsing.parser import parse_clippings_file
+from app.parsing.parser import ParsedClipping, file_fingerprint, find_last_entry_end, iter_clippings
 
 logger = logging.getLogger(__name__)
 
-def get_or_create_book(db: Session, title: str, author: Optional[str]) -> models.Book:
-    """
-    Gets a book from DB based on title and author, or creates it if not found.
-    Uses the author string directly as provided (assuming parser normalization).
-    TODO: Implement more advanced author consolidation/matching if needed later.
-    """
-    book = db.query(models.Book).filter_by(title=title, author=author).first()
-    if book:
-        return book
-    else:
-        logger.info(f"Creating new book entry: Title='{title}', Author='{author}'")
-        book = models.Book(title=title, author=author)
-        db.add(book)
-        try:
-            # Flush to get the book.id assigned by the database, needed for foreign key relationships
-            db.flush()
-            logger.info(f"Flushed new book: {book.title} (ID: {book.id})")
-            return book
-        except IntegrityError as e:
-            # This might happen in concurrent scenarios or if normalization fails to catch an existing author variation
-            db.rollback() # Rollback the failed flush
-            logger.warning(f"IntegrityError on flush for book: {title} ({author}). Attempting recovery lookup. Error: {e}")
-            # Retry the query to get the potentially concurrently created or existing book
-            book = db.query(models.Book).filter_by(title=title, author=author).first()
-            if book:
-                 logger.info(f"Recovered book after IntegrityError: {book.title} (ID: {book.id})")
-                 return book
+# Number of parsed clippings written per INSERT batch during import.
+# The whole import is committed once at the end, so this only bounds memory per batch.
+IMPORT_BATCH_SIZE = 1000
+
+# Parsed clippings buffered between the parser and the database writer thread
+IMPORT_QUEUE_SIZE = 10000
+# Marks the end of the parsed clippings on the writer queue
+_END_OF_INPUT = object()
+
+# INSERT that lets SQLite skip rows violating any clipping uniqueness index,
+# so duplicate detection happens inside the database instead of a SELECT per row
+_INSERT_CLIPPING_IGNORE_DUPLICATES = sqlite_insert(models.Clipping).on_conflict_do_nothing()
+
+# Bulk book INSERT, plus a variant returning the new rows' IDs with their natural key
+# for SQLite 3.35+, the first version with RETURNING
+_INSERT_BOOK_IGNORE_DUPLICATES = sqlite_insert(models.Book).on_conflict_do_nothing()
+_INSERT_BOOK_RETURNING_IDS = _INSERT_BOOK_IGNORE_DUPLICATES.returning(
+    models.Book.id, models.Book.title, models.Book.author
+)
+
+# Book lookups by natural key. The expanding IN parameters let each statement be compiled
+# once and re-executed with any number of keys, without building an ORM Query per chunk
+_SELECT_BOOK_IDS = select(models.Book.id, models.Book.title, models.Book.author).where(
+    tuple_(models.Book.title, models.Book.author).in_(bindparam("keys", expanding=True))
+)
+_SELECT_AUTHORLESS_BOOK_IDS = select(models.Book.id, models.Book.title).where(
+    models.Book.author.is_(None), models.Book.title.in_(bindparam("titles", expanding=True))
+)
+
+# Ingest watermark lookup and upsert for a file fingerprint
+_SELECT_INGEST_OFFSET = select(models.IngestState.last_offset).where(
+    models.IngestState.file_fingerprint == bindparam("fingerprint")
+)
+_insert_ingest_state = sqlite_insert(models.IngestState)
+_UPSERT_INGEST_OFFSET = _insert_ingest_state.values(
+    file_fingerprint=bindparam("fingerprint"), last_offset=bindparam("last_offset")
+).on_conflict_do_update(
+    index_elements=[models.IngestState.file_fingerprint],
+    set_={"last_offset": _insert_ingest_state.excluded.last_offset}
+)
+
+# One page of the book list, selecting only the columns shown rather than whole Book objects.
+# Ordered by id last so every page boundary is deterministic.
+_SELECT_BOOK_PAGE = (
+    select(models.Book.id, models.Book.title, models.Book.author)
+    .order_by(models.Book.author, models.Book.title, models.Book.id)
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+# (title, author) pairs per book lookup query, keeping bound parameters well under SQLite's limit
+BOOK_LOOKUP_CHUNK_SIZE = 400
+
+# A book's natural key as produced by the parser
+BookKey = Tuple[str, Optional[str]]
+
+def _fetch_book_ids(db: Session, book_keys: Iterable[BookKey]) -> Dict[BookKey, int]:
+    """
+    Looks up the IDs of existing books for the given (title, author) pairs in a few chunked queries.
+    Books without an author are matched with IS NULL, since a NULL never compares equal in an IN list.
+    """
+    book_keys = list(book_keys)
+    with_author = [key for key in book_keys if key[1] is not None]
+    without_author = [title for title, author in book_keys if author is None]
+
+    conn = db.connection()
+    book_ids: Dict[BookKey, int] = {}
+    for start in range(0, len(with_author), BOOK_LOOKUP_CHUNK_SIZE):
+        chunk = with_author[start:start + BOOK_LOOKUP_CHUNK_SIZE]
+        rows = conn.execute(_SELECT_BOOK_IDS, {"keys": chunk})
+        book_ids.update({(title, author): book_id for book_id, title, author in rows})
+    for start in range(0, len(without_author), BOOK_LOOKUP_CHUNK_SIZE):
+        chunk = without_author[start:start + BOOK_LOOKUP_CHUNK_SIZE]
+        rows = conn.execute(_SELECT_AUTHORLESS_BOOK_IDS, {"titles": chunk})
+        book_ids.update({(title, None): book_id for book_id, title in rows})
+    return book_ids
+
+def resolve_book_ids(db: Session, book_keys: Set[BookKey]) -> Dict[BookKey, int]:
+    """
+    Maps every (title, author) pair to a book ID, creating the books that don't exist yet.
+    Two phases instead of a lookup per clipping: one chunked SELECT for the existing books,
+    then one bulk INSERT ... RETURNING for the missing ones, which hands back their new IDs.
+    On SQLite older than 3.35 (no RETURNING), the new IDs are looked up after a plain INSERT.
+    """
+    book_ids = _fetch_book_ids(db, book_keys)
+    missing = [key for key in book_keys if key not in book_ids]
+    if missing:
+        logger.info("Creating %s new book entries", len(missing))
+        conn = db.connection()
+        book_rows = [{"title": title, "author": author} for title, author in missing]
+        if conn.dialect.insert_returning:
+            # Sent as multi-row INSERT statements (insertmanyvalues), so the new IDs come back
+            # without a follow-up SELECT
+            rows = conn.execute(_INSERT_BOOK_RETURNING_IDS, book_rows)
+            book_ids.update({(title, author): book_id for book_id, title, author in rows})
+        else:
+            conn.execute(_INSERT_BOOK_IGNORE_DUPLICATES, book_rows)
+        # Books skipped by ON CONFLICT (created concurrently), or inserted without RETURNING, are looked up
+        unresolved = [key for key in missing if key not in book_ids]
+        if unresolved:
+            book_ids.update(_fetch_book_ids(db, unresolved))
+    return book_ids
+
+def drop_secondary_indexes(db: Session) -> None:
+    """
+    Drops the non-unique clipping indexes ahead of a bulk ingest.
+    Every insert otherwise has to update each of these b-trees; they are rebuilt
+    once by create_secondary_indexes after the load. Unique indexes stay, since
+    the import relies on them to skip duplicates.
+    """
+    conn = db.connection()
+    for index in models.Clipping.__table__.indexes:
+        if not index.unique:
+            conn.execute(DropIndex(index, if_exists=True))
+    db.commit()
+    logger.info("Dropped secondary clipping indexes for bulk ingest.")
+
+def create_secondary_indexes(db: Session) -> None:
+    """Recreates any clipping index dropped by drop_secondary_indexes."""
+    conn = db.connection()
+    for index in models.Clipping.__table__.indexes:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+    db.commit()
+    logger.info("Recreated secondary clipping indexes.")
+
+def _write_clipping_batch(db: Session, clipping_rows: List[Dict[str, Any]]) -> int:
+    """
+    Inserts a batch of clipping rows with a single executemany INSERT, without committing.
+    Rows are plain dicts keyed by column name, so the ORM unit-of-work is skipped entirely.
+    Rows already in the database are skipped by ON CONFLICT DO NOTHING.
+    Returns the number of rows actually inserted.
+    """
+    if not clipping_rows:
+        return 0
+    # Run on the session's Core connection: a plain executemany whose rowcount
+    # is the number of rows actually inserted (ORM bulk results don't report it)
+    result = db.connection().execute(_INSERT_CLIPPING_IGNORE_DUPLICATES, clipping_rows)
+    return result.rowcount
+
+def _import_batch(db: Session, batch: List[ParsedClipping], book_ids: Dict[BookKey, int]) -> Tuple[int, int]:
+    """
+    Writes one batch of parsed clippings into the import's transaction, without committing.
+    Books first seen in this batch are resolved and added to the book_ids cache.
+    Clippings without a book ID are counted as errors without touching the session;
+    database errors are raised to the caller, which rolls back the whole import.
+    Returns (added, errors) counts for the batch.
+    """
+    error_count = 0
+
+    # 1. Resolve books first seen in this batch; books from earlier batches come from the cache
+    new_book_keys = {(c.book_title, c.author) for c in batch} - book_ids.keys()
+    if new_book_keys:
+        book_ids.update(resolve_book_ids(db, new_book_keys))
+
+    # New clipping rows for this batch's INSERT
+    pending_rows: List[Dict[str, Any]] = []
+
+    # Bound method looked up once, not on every clipping
+    add_row = pending_rows.append
+
+    for clipping_data in batch:
+        book_id = book_ids.get((clipping_data.book_title, clipping_data.author))
+
+        if book_id is None: # Should not happen once resolve_book_ids has succeeded
+            logger.error("Skipping clipping due to missing or invalid book ID for '%s'", clipping_data.book_title)
+            error_count += 1
+            continue
+
+        # 2. Queue the new clipping as a plain row for the batch INSERT; duplicates of
+        # clippings already in the database are skipped by the INSERT itself (ON CONFLICT DO NOTHING)
+        add_row({
+            "book_id": book_id,
+            "clipping_type": clipping_data.clipping_type,
+            "location": clipping_data.location,
+            "location_start": clipping_data.location_start,
+            "location_end": clipping_data.location_end,
+            "page": clipping_data.page,
+            "clipping_date": clipping_data.clipping_date,
+            "content": clipping_data.content,
+            "content_hash": clipping_data.content_hash
+            # sentiment_score is null initially
+        })
+
+    return _write_clipping_batch(db, pending_rows), error_count
+
+def _run_clipping_writer(db: Session, clipping_queue: "queue.Queue", summary: Dict[str, int]) -> None:
+    """
+    Body of the database writer thread: drains parsed clippings from the queue and imports them
+    in batches of IMPORT_BATCH_SIZE until the end-of-input marker arrives.
+    The session is only used from this thread while an import is running. If a batch fails, the
+    import's transaction is rolled back and the remaining clippings are drained without writing.
+    """
+    book_ids: Dict[BookKey, int] = {}
+    batch: List[ParsedClipping] = []
+    write_failed = False
+
+    while True:
+        clipping_data = clipping_queue.get()
+        end_of_input = clipping_data is _END_OF_INPUT
+        if not end_of_input:
+            batch.append(clipping_data)
+
+        # Write in batches so large files don't hold every pending row in memory
+        if batch and (end_of_input or len(batch) >= IMPORT_BATCH_SIZE):
+            if write_failed:
+                summary["errors"] += len(batch)
             else:
-                # If still not found, re-raise or handle as critical failure
-                logger.error(f"Failed to get or create book after IntegrityError recovery attempt: {title} ({author})")
-                # Raise a specific exception or return None, depending on desired handling
-                raise ValueError(f"Failed to get or create book: {title} ({author}) after IntegrityError")
-        except Exception as e:
-             db.rollback()
-             logger.error(f"Unexpected error during book flush for {title} ({author}): {e}", exc_info=True)
-             raise # Re-raise unexpected errors
-
-def import_clippings(db: Session, file_path: str) -> Dict[str, int]:
-    """
-    Parses a MyClippings file, checks for duplicates, and imports new clippings.
-    Returns a dictionary with counts of processed, added, duplicate, and error clippings.
+                logger.info("Writing batch of %s clippings (%s added so far)...", len(batch), summary['added'])
+                try:
+                    added, errors = _import_batch(db, batch, book_ids)
+                    summary["added"] += added
+                    summary["errors"] += errors
+                except Exception as e:
+                    logger.error("Failed to write batch of %s clippings, rolling back the import: %s", len(batch), e, exc_info=True)
+                    db.rollback()
+                    write_failed = True
+                    # Nothing from this import is kept, including earlier batches
+                    summary["errors"] += summary["added"] + len(batch)
+                    summary["added"] = 0
+            batch = []
+
+        if end_of_input:
+            return
+
+def _find_resume_range(db: Session, file_path: str, incremental: bool = True) -> Tuple[Optional[str], int, Optional[int]]:
+    """
+    Works out which part of the file still needs importing.
+    Returns (fingerprint, start_offset, end_offset): parsing resumes at the offset recorded for this
+    file's fingerprint and stops after the last complete entry. If the file is not recognised,
+    or has shrunk since, or incremental is False, the whole file is parsed; the fingerprint and
+    end offset are still returned so the watermark can be saved afterwards.
+    The fingerprint is None if the state can't be read.
     """
-    logger.info(f"Starting import process for file: {file_path}")
     try:
-        parsed_data = parse_clippings_file(file_path)
+        fingerprint = file_fingerprint(file_path)
+        end_offset = find_last_entry_end(file_path)
+        last_offset = None
+        if incremental:
+            last_offset = db.connection().execute(_SELECT_INGEST_OFFSET, {"fingerprint": fingerprint}).scalar()
     except Exception as e:
-        logger.error(f"Failed during parsing phase for file {file_path}: {e}", exc_info=True)
-        return {"processed": 0, "added": 0, "duplicates": 0, "errors": 0}
+        logger.warning("Could not read ingest state for %s, parsing the whole file: %s", file_path, e)
+        db.rollback()
+        return None, 0, None
 
+    if last_offset is not None and last_offset <= end_offset:
+        logger.info("Resuming import of %s from byte %s", file_path, last_offset)
+        return fingerprint, last_offset, end_offset
+    return fingerprint, 0, end_offset
 
-    if not parsed_data:
-        logger.warning("No clippings parsed from file.")
-        return {"processed": 0, "added": 0, "duplicates": 0, "errors": 0}
+def _save_ingest_state(db: Session, fingerprint: str, last_offset: int) -> None:
+    """
+    Records how far into the file identified by fingerprint has been imported.
+    Not committed here, so the watermark is saved in the same transaction as the clippings.
+    """
+    db.connection().execute(_UPSERT_INGEST_OFFSET, {"fingerprint": fingerprint, "last_offset": last_offset})
 
-    added_count = 0
-    duplicate_count = 0
-    error_count = 0
-    processed_count = len(parsed_data)
-    
-    # Track items added in this session to avoid duplicate processing
-    session_added_signatures = set()
-
-    # Keep track of books processed in this session to potentially reduce queries, although get_or_create handles caching via Session
-    # book_cache = {} # Optional optimization
-
-    for idx, clipping_data in enumerate(parsed_data):
-        try:
-            # 1. Get or Create Book record
-            book = get_or_create_book(db, clipping_data["book_title"], clipping_data["author"])
-
-            if not book or not book.id: # Should not happen if get_or_create_book raises on critical failure
-                 logger.error(f"Skipping clipping #{idx+1} due to missing or invalid book ID for '{clipping_data['book_title']}'")
-                 error_count += 1
-                 continue
-             
-            # Create a unique signature for the clipping to track in this session
+def import_clippings(db: Session, file_path: str, incremental: bool = True) -> Dict[str, int]:
+    """
+    Parses a MyClippings file and imports new clippings, skipping duplicates.
+    Parsing (CPU-bound) runs on the calling thread while a single writer thread inserts
+    the parsed clippings in batches, so SQLite's write latency overlaps with parsing.
+    The whole import is a single transaction: it is committed once at the end, or not at all.
+    With incremental=True, entries already imported from the same file on an earlier run
+    are not parsed again; Kindle only ever appends to MyClippings.txt. Either way, a clean run
+    records how far the file was imported, for the next incremental run.
+    Returns a dictionary with counts of processed, added, duplicate, and error clippings.
+    """
+    logger.info("Starting import process for file: %s", file_path)
+
+    fingerprint, start_offset, end_offset = _find_resume_range(db, file_path, incremental)
+
+    summary = {"processed": 0, "added": 0, "duplicates": 0, "errors": 0}
+    clipping_queue: "queue.Queue" = queue.Queue(maxsize=IMPORT_QUEUE_SIZE)
+    writer = threading.Thread(
+        target=_run_clipping_writer, args=(db, clipping_queue, summary), name="clipping-writer", daemon=True
+    )
+    writer.start()
+
+    # Natural signatures of the clippings queued so far. A clipping repeated within the file
+    # (common in re-exported files) is dropped here, before it costs a queue slot or an INSERT row;
+    # it is still counted as processed, so it shows up in the duplicates total
+    queued_signatures: Set[Tuple] = set()
+    is_queued = queued_signatures.__contains__
+    add_queued = queued_signatures.add
+    put_clipping = clipping_queue.put
+    parse_failed = False
+
+    try:
+        for clipping_data in iter_clippings(file_path, start_offset, end_offset):
+            summary["processed"] += 1
+            # Clippings unpickled from parser processes each carry their own copy of the
+            # type string; interning makes every signature share one of three objects
             signature = (
-                book.id,
-                clipping_data["clipping_type"],
-                clipping_data["location"],
-                clipping_data["content_hash"] # None for bookmarks
+                clipping_data.book_title,
+                clipping_data.author,
+                sys.intern(clipping_data.clipping_type),
+                clipping_data.location,
+                clipping_data.content_hash # None for bookmarks
             )
+            if is_queued(signature):
+                continue
+            add_queued(signature)
+            put_clipping(clipping_data)
+    except Exception as e:
+        # Clippings parsed before the failure are still imported
+        logger.error("Failed during parsing phase for file %s: %s", file_path, e, exc_info=True)
+        parse_failed = True
+    finally:
+        clipping_queue.put(_END_OF_INPUT)
+        writer.join()
 
-            # 2. Check for Duplicate Clipping using the unique constraint criteria
-            # (book_id, clipping_type, location, content_hash)
-            existing_clipping = db.query(models.Clipping.id).filter_by( # Only query for ID for efficiency
-                book_id=signature[0],
-                clipping_type=signature[1],
-                location=signature[2],
-                content_hash=signature[3]
-            ).first() 
-            
-            is_pending_dublicate = signature in session_added_signatures
-
-            if existing_clipping or is_pending_dublicate:
-                duplicate_count += 1
-                continue # Skip adding this duplicate
-            
-            # Add signature to session tracker BEFORE adding the object
-            session_added_signatures.add(signature)
-
-            # 3. Create and Add New Clipping record
-            try:
-                new_clipping = models.Clipping(
-                    book_id=book.id,
-                    clipping_type=clipping_data["clipping_type"],
-                    location=clipping_data["location"],
-                    page=clipping_data["page"],
-                    clipping_date=clipping_data["clipping_date"],
-                    content=clipping_data["content"],
-                    content_hash=clipping_data["content_hash"]
-                    # sentiment_score is null initially
-                )
-                db.add(new_clipping)
-                added_count += 1
-            
-            except KeyError as ke:
-                logger.error(f"KeyError creating Clipping object: Missing key {ke}. Data: {clipping_data}", exc_info=False)
-                # Propagate the error count from the outer loop's except block or handle here
-                # Let the outer loop handle rollback and error counting for simplicity now.
-                raise # Re-raise to be caught by the outer loop's generic Exception handler
-                # except Exception as creation_e: # Catch other potential creation errors
-                #      logger.error(f"Error creating Clipping object: {creation_e}. Data: {clipping_data}", exc_info=True)
-                #      raise # Re-raise
-
-            # Optional: Flush periodically for large files? Maybe not needed for typical MyClippings sizes.
-            # if added_count % 500 == 0:
-            #     logger.info(f"Flushing session after {added_count} additions...")
-            #     db.flush()
-
-        except Exception as e:
-            # Log specific clipping data that caused the error for easier debugging
-            err_loc = clipping_data.get('location', 'N/A')
-            err_con_hash = clipping_data.get('content_hash', 'N/A')
-            logger.error(f"Failed to process parsed clipping #{idx+1} ({clipping_data.get('book_title', 'N/A')} L:{err_loc} H:{err_con_hash}): {e}", exc_info=False) # Set exc_info=True for full traceback
-            error_count += 1
-            # Important: Rollback changes potentially added in this iteration's try block
-            db.rollback()
-            continue
-        
-    # Debugging: print dict and its keys before access
-    logger.debug(f"DEBUG: Processing clipping_data: {clipping_data}")
-    logger.debug(f"DEBUG: Keys in clipping_data: {clipping_data.keys()}")
-    
-
-    # Final commit for all additions in this import run
     try:
-        logger.info(f"Attempting final commit for {added_count} new clippings...")
+        # Only move the watermark past entries that were all parsed and written; otherwise retry them next time
+        if fingerprint is not None and end_offset is not None and not summary["errors"] and not parse_failed:
+            _save_ingest_state(db, fingerprint, end_offset)
         db.commit()
-        logger.info("Final commit successful.")
     except Exception as e:
-        logger.error(f"Final commit failed after processing file {file_path}: {e}", exc_info=True)
-        # If commit fails, none of the clippings were actually saved
-        error_count += added_count # Count previously 'added' items as errors now
-        added_count = 0
+        logger.error("Failed to commit import of %s: %s", file_path, e, exc_info=True)
         db.rollback()
-        
-        
-    actual_duplicates = processed_count - added_count - error_count
-    summary = {
-        "processed": processed_count,
-        "added": added_count,
-        "duplicates": max(0, actual_duplicates), # Ensure non-negative
-        "errors": error_count
-    }
-     # Ensure calculated duplicates isn't negative if errors caused discrepancies
-    summary["duplicates"] = max(0, summary["duplicates"])
-
-    logger.info(f"Import finished for {file_path}. Summary: {summary}")
+        summary["errors"] += summary["added"]
+        summary["added"] = 0
+
+    if not summary["processed"]:
+        logger.warning("No clippings parsed from file.")
+        return summary
+
+    actual_duplicates = summary["processed"] - summary["added"] - summary["errors"]
+    # Ensure calculated duplicates isn't negative if errors caused discrepancies
+    summary["duplicates"] = max(0, actual_duplicates)
+
+    logger.info("Import finished for %s. Summary: %s", file_path, summary)
     return summary
 
 # --- Placeholder for other service functions ---
 
-def list_books(db: Session) -> List[models.Book]:
-    """Lists all unique books."""
-    logger.info("Fetching list of all books.")
+def list_books(db: Session, limit: int = 100, offset: int = 0) -> List[Row]:
+    """
+    Lists one page of unique books, ordered by author and title.
+    Returns rows with id, title and author attributes.
+    """
+    logger.info("Fetching books %s to %s.", offset + 1, offset + limit)
     try:
-        # Query all books, order them for consistency
-        books = db.query(models.Book).order_by(models.Book.author, models.Book.title).all()
-        return books
+        return db.execute(_SELECT_BOOK_PAGE, {"limit": limit, "offset": offset}).all()
     except Exception as e:
-        logger.error(f"Failed to fetch books: {e}", exc_info=True)
+        logger.error("Failed to fetch books: %s", e, exc_info=True)
         return []
     
 def get_clippings_for_book(db: Session, book_id: int) -> List[models.Clipping]:
     """Gets all clippings for a specific book ID."""
-    logger.info(f"Fetching clippings for book_id: {book_id}")
+    logger.info("Fetching clippings for book_id: %s", book_id)
     # TODO: Implement query
     # return db.query(models.Clipping).filter(models.Clipping.book_id == book_id).order_by(models.Clipping.clipping_date).all() # Or order by location
     pass # Placeholder
 
 def get_random_clipping(db: Session, book_id: Optional[int] = None) -> Optional[models.Clipping]:
-    """Gets a random clipping, optionally filtered by book ID."""
-    logger.info(f"Fetching random clipping. Book filter ID: {book_id}")
-    # TODO: Implement query (Random selection in SQL can be tricky/DB specific)
-    # import random
-    # query = db.query(models.Clipping)
-    # if book_id:
-    #     query = query.filter(models.Clipping.book_id == book_id)
-    # count = query.count()
-    # if count > 0:
-    #     return query.offset(random.randint(0, count - 1)).first()
-    # return None
-    pass # Placeholder
\ No newline at end of file
+    """
+    Gets a random clipping, optionally filtered by book ID.
+    The database picks the row in a single pass (ORDER BY random() LIMIT 1), rather than
+    a COUNT followed by an OFFSET that walks the table a second time.
+    """
+    logger.info("Fetching random clipping. Book filter ID: %s", book_id)
+    stmt = select(models.Clipping).order_by(func.random()).limit(1)
+    if book_id is not None:
+        # The book filter is served by the (book_id, ...) indexes, so only that book's clippings are shuffled
+        stmt = stmt.where(models.Clipping.book_id == book_id)
+    try:
+        return db.scalars(stmt).first()
+    except Exception as e:
+        logger.error("Failed to fetch a random clipping: %s", e, exc_info=True)
+        return None
\ No newline at end of file
@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+# app.database.database creates its data directory under HOME at import time;
+# point it at a scratch directory so the tests never touch the real database
+os.environ["HOME"] = tempfile.mkdtemp(prefix="kindle_insights_tests_")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import database, models # noqa: F401 (registers the models on Base)
+from app.database.migrations import run_migrations
+
+DEFAULT_DATE = "Sunday, March 30, 2025 10:00:00 AM"
+
+def clipping_entry(title, author=None, clipping_type="Highlight", location="100-102", page=None,
+                   content="Some highlighted text", date=DEFAULT_DATE):
+    """Builds one MyClippings.txt entry, delimiter line included"""
+    title_line = f"{title} ({author})" if author else title
+    if page and location:
+        where = f"on page {page} | Location {location}"
+    elif page:
+        where = f"on page {page}"
+    else:
+        where = f"on Location {location}"
+    body = "" if clipping_type == "Bookmark" else content
+    return f"{title_line}\n- Your {clipping_type} {where} | Added on {date}\n\n{body}\n==========\n"
+
+@pytest.fixture
+def make_entry():
+    return clipping_entry
+
+@pytest.fixture
+def write_clippings(tmp_path):
+    """Writes entries to a clippings file (appending when asked) and returns its path as a string"""
+    path = tmp_path / "My Clippings.txt"
+
+    def write(*entries, append=False, newline="\n"):
+        with open(path, "a" if append else "w", encoding="utf-8", newline=newline) as file:
+            file.write("".join(entries))
+        return str(path)
+
+    return write
+
+@pytest.fixture
+def engine(tmp_path):
+    """An empty SQLite database configured like the application's engine"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    event.listen(engine, "connect", database._set_sqlite_pragmas)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(engine):
+    """Session factory for a database initialised the way init_db does it"""
+    database.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.database import models
+from app.parsing.parser import FINGERPRINT_SIZE, find_last_entry_end
+from app.services import clipping_service
+
+def count_rows(db, model):
+    return db.execute(select(func.count()).select_from(model)).scalar()
+
+def saved_offsets(db):
+    return db.execute(select(models.IngestState.last_offset)).scalars().all()
+
+@pytest.fixture
+def entries(make_entry):
+    # The first entry alone fills the fingerprinted head of the file, so the
+    # file is recognised as the same one when entries are appended
+    first_content = "x" * FINGERPRINT_SIZE
+    return [
+        make_entry("Deep Work", "Cal Newport", location=f"{100 + i}", content=first_content if i == 0 else f"Highlight {i}")
+        for i in range(5)
+    ]
+
+def test_import_skips_duplicates_within_file_and_database(db, make_entry, write_clippings):
+    highlight = make_entry("Deep Work", "Cal Newport", content="Focus")
+    bookmark = make_entry("Deep Work", "Cal Newport", "Bookmark", location="300")
+    path = write_clippings(highlight, highlight, bookmark, bookmark)
+
+    summary = clipping_service.import_clippings(db, path)
+    assert summary == {"processed": 4, "added": 2, "duplicates": 2, "errors": 0}
+
+    summary = clipping_service.import_clippings(db, path, incremental=False)
+    assert summary == {"processed": 4, "added": 0, "duplicates": 4, "errors": 0}
+    assert count_rows(db, models.Clipping) == 2
+    assert count_rows(db, models.Book) == 1
+
+def test_append_then_resume(db, entries, write_clippings):
+    path = write_clippings(*entries[:3])
+    assert clipping_service.import_clippings(db, path)["added"] == 3
+    assert saved_offsets(db) == [find_last_entry_end(path)]
+
+    write_clippings(*entries[3:], append=True)
+    summary = clipping_service.import_clippings(db, path)
+
+    assert summary == {"processed": 2, "added": 2, "duplicates": 0, "errors": 0}
+    assert saved_offsets(db) == [find_last_entry_end(path)]
+    assert clipping_service.import_clippings(db, path)["processed"] == 0
+    assert count_rows(db, models.Clipping) == 5
+
+def test_small_file_is_parsed_in_full_as_it_grows(db, make_entry, write_clippings):
+    # Below FINGERPRINT_SIZE, appending changes the fingerprint, so the file isn't resumed
+    path = write_clippings(make_entry("Deep Work", "Cal Newport", content="first"))
+    clipping_service.import_clippings(db, path)
+
+    write_clippings(make_entry("Deep Work", "Cal Newport", location="200", content="second"), append=True)
+    summary = clipping_service.import_clippings(db, path)
+
+    assert summary == {"processed": 2, "added": 1, "duplicates": 1, "errors": 0}
+
+def test_partial_trailing_entry_is_imported_once_complete(db, entries, write_clippings):
+    path = write_clippings(entries[0], entries[1][:40])
+    assert clipping_service.import_clippings(db, path)["processed"] == 1
+
+    write_clippings(entries[1][40:], append=True)
+    summary = clipping_service.import_clippings(db, path)
+
+    assert summary == {"processed": 1, "added": 1, "duplicates": 0, "errors": 0}
+    assert count_rows(db, models.Clipping) == 2
+
+def test_full_import_saves_watermark(db, entries, write_clippings):
+    path = write_clippings(*entries)
+    assert clipping_service.import_clippings(db, path, incremental=False)["added"] == 5
+
+    assert saved_offsets(db) == [find_last_entry_end(path)]
+    assert clipping_service.import_clippings(db, path)["processed"] == 0
+
+def test_failed_batch_commits_nothing(db, entries, write_clippings, monkeypatch):
+    path = write_clippings(*entries)
+    monkeypatch.setattr(clipping_service, "IMPORT_BATCH_SIZE", 2)
+    write_clipping_batch = clipping_service._write_clipping_batch
+    calls = []
+
+    def fail_second_batch(db, clipping_rows):
+        calls.append(len(clipping_rows))
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        return write_clipping_batch(db, clipping_rows)
+    monkeypatch.setattr(clipping_service, "_write_clipping_batch", fail_second_batch)
+
+    summary = clipping_service.import_clippings(db, path)
+
+    assert summary == {"processed": 5, "added": 0, "duplicates": 0, "errors": 5}
+    assert count_rows(db, models.Clipping) == 0
+    assert count_rows(db, models.Book) == 0
+    assert saved_offsets(db) == []
+
+    monkeypatch.setattr(clipping_service, "_write_clipping_batch", write_clipping_batch)
+    assert clipping_service.import_clippings(db, path)["added"] == 5
+
+def test_parse_failure_keeps_parsed_clippings_without_watermark(db, entries, write_clippings, monkeypatch):
+    path = write_clippings(*entries)
+    iter_clippings = clipping_service.iter_clippings
+
+    def fail_after_two(*args):
+        for index, clipping in enumerate(iter_clippings(*args)):
+            if index == 2:
+                raise RuntimeError("parse failed")
+            yield clipping
+    monkeypatch.setattr(clipping_service, "iter_clippings", fail_after_two)
+
+    assert clipping_service.import_clippings(db, path)["added"] == 2
+    assert saved_offsets(db) == []
+
+    monkeypatch.setattr(clipping_service, "iter_clippings", iter_clippings)
+    summary = clipping_service.import_clippings(db, path)
+    assert summary == {"processed": 5, "added": 3, "duplicates": 2, "errors": 0}
+    assert saved_offsets(db) == [find_last_entry_end(path)]
+
+def test_list_books_pages(db, make_entry, write_clippings):
+    path = write_clippings(*(make_entry(f"Book {i}", "Author") for i in range(5)))
+    clipping_service.import_clippings(db, path)
+
+    first_page = clipping_service.list_books(db, limit=2)
+    second_page = clipping_service.list_books(db, limit=2, offset=2)
+
+    assert [book.title for book in first_page] == ["Book 0", "Book 1"]
+    assert [book.title for book in second_page] == ["Book 2", "Book 3"]
+
+def test_get_random_clipping_filters_by_book(db, make_entry, write_clippings):
+    assert clipping_service.get_random_clipping(db) is None
+
+    path = write_clippings(make_entry("Deep Work", "Cal Newport"), make_entry("Walden", "Thoreau"))
+    clipping_service.import_clippings(db, path)
+    walden_id = db.execute(select(models.Book.id).where(models.Book.title == "Walden")).scalar()
+
+    assert clipping_service.get_random_clipping(db, book_id=walden_id).book_id == walden_id
@@ -0,0 +1,121 @@
+import hashlib
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import database
+from app.database.migrations import (
+    add_location_range_columns,
+    rehash_content_hashes,
+    run_migrations,
+)
+from app.parsing.parser import generate_content_hash
+from app.services import clipping_service
+
+# Schema created by the original models, before content hashes became BLAKE2b
+# digests and locations gained integer columns
+BASELINE_SCHEMA = (
+    """CREATE TABLE books (
+        id INTEGER NOT NULL,
+        title VARCHAR NOT NULL,
+        author VARCHAR,
+        PRIMARY KEY (id),
+        CONSTRAINT _book_author_uc UNIQUE (title, author)
+    )""",
+    "CREATE INDEX ix_books_title ON books (title)",
+    "CREATE INDEX ix_books_id ON books (id)",
+    "CREATE INDEX ix_books_author ON books (author)",
+    """CREATE TABLE clippings (
+        id INTEGER NOT NULL,
+        book_id INTEGER NOT NULL,
+        clipping_type VARCHAR NOT NULL,
+        location VARCHAR,
+        page VARCHAR,
+        clipping_date DATETIME NOT NULL,
+        content TEXT,
+        content_hash VARCHAR(64),
+        sentiment_score FLOAT,
+        PRIMARY KEY (id),
+        CONSTRAINT _clipping_uniqueness_uc UNIQUE (book_id, clipping_type, location, content_hash),
+        FOREIGN KEY(book_id) REFERENCES books (id)
+    )""",
+    "CREATE INDEX ix_clippings_id ON clippings (id)",
+    "CREATE INDEX ix_clippings_content_hash ON clippings (content_hash)",
+    "CREATE INDEX ix_clippings_clipping_date ON clippings (clipping_date)",
+    "CREATE INDEX ix_clipping_book_date ON clippings (book_id, clipping_date)",
+    "CREATE INDEX ix_clippings_book_id ON clippings (book_id)",
+    "CREATE INDEX ix_clipping_book_location ON clippings (book_id, location)",
+    "CREATE INDEX ix_clippings_location ON clippings (location)",
+    "CREATE INDEX ix_clippings_clipping_type ON clippings (clipping_type)",
+)
+
+BASELINE_CLIPPINGS = (
+    # (id, clipping_type, location, content)
+    (1, "Highlight", "1234-45", "Some highlighted text"),
+    (2, "Note", "300", "A note"),
+    (3, "Bookmark", "310", None),
+)
+
+def sha256_hex(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest() if content else None
+
+@pytest.fixture
+def baseline_engine(engine):
+    """A database created and populated by the original schema"""
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO books (id, title, author) VALUES (1, 'Deep Work', 'Cal Newport')"))
+        for clipping_id, clipping_type, location, content in BASELINE_CLIPPINGS:
+            conn.execute(
+                text(
+                    "INSERT INTO clippings (id, book_id, clipping_type, location, clipping_date, content, content_hash) "
+                    "VALUES (:id, 1, :clipping_type, :location, :clipping_date, :content, :content_hash)"
+                ),
+                {"id": clipping_id, "clipping_type": clipping_type, "location": location,
+                 "clipping_date": datetime(2025, 3, 30, 10, 0), "content": content,
+                 "content_hash": sha256_hex(content)},
+            )
+    return engine
+
+def test_rehash_content_hashes(baseline_engine):
+    assert rehash_content_hashes(baseline_engine) == 2
+
+    with baseline_engine.connect() as conn:
+        hashes = dict(conn.execute(text("SELECT id, content_hash FROM clippings")).all())
+    assert hashes == {
+        clipping_id: generate_content_hash(content) for clipping_id, _, _, content in BASELINE_CLIPPINGS
+    }
+    # Already-migrated rows are left alone
+    assert rehash_content_hashes(baseline_engine) == 0
+
+def test_add_location_range_columns(baseline_engine):
+    assert add_location_range_columns(baseline_engine) == 3
+
+    with baseline_engine.connect() as conn:
+        ranges = conn.execute(text("SELECT id, location_start, location_end FROM clippings ORDER BY id")).all()
+    assert [tuple(row) for row in ranges] == [(1, 1234, 1245), (2, 300, None), (3, 310, None)]
+    assert add_location_range_columns(baseline_engine) == 0
+
+def test_migrated_database_deduplicates_new_imports(baseline_engine, make_entry, write_clippings):
+    database.Base.metadata.create_all(bind=baseline_engine)
+    run_migrations(baseline_engine)
+    run_migrations(baseline_engine) # Idempotent
+
+    with baseline_engine.connect() as conn:
+        index_names = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    assert "ux_clipping_signature" in index_names
+    assert not {"ix_clippings_location", "ix_clipping_book_location"} & index_names
+
+    path = write_clippings(
+        make_entry("Deep Work", "Cal Newport", location="1234-45", content="Some highlighted text"),
+        make_entry("Deep Work", "Cal Newport", "Bookmark", location="310"),
+        make_entry("Deep Work", "Cal Newport", location="400", content="New text"),
+    )
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=baseline_engine)
+    with Session() as db:
+        summary = clipping_service.import_clippings(db, path)
+
+    assert summary == {"processed": 3, "added": 1, "duplicates": 2, "errors": 0}
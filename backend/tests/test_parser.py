@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import pytest
+from dateutil.parser import parse as parse_date
+
+from app.parsing import parser
+from app.parsing.parser import (
+    ParsedClipping,
+    find_last_entry_end,
+    generate_content_hash,
+    iter_clippings,
+    parse_clippings_file,
+    parse_kindle_date,
+    parse_location_range,
+)
+
+def test_parse_round_trip(make_entry, write_clippings):
+    path = write_clippings(
+        make_entry("Deep Work", "Cal Newport", content="Focus is ========== rare\nsecond line"),
+        make_entry("Deep Work", "Cal Newport", "Bookmark", location="2090-93"),
+        make_entry("Notes Book", None, "Note", location=None, page="12", content="a note"),
+    )
+
+    highlight, bookmark, note = parse_clippings_file(path)
+
+    # A delimiter inside a line of text is content, not the end of the entry
+    assert highlight == ParsedClipping(
+        book_title="Deep Work",
+        author="Cal Newport",
+        clipping_type="Highlight",
+        page=None,
+        location="100-102",
+        location_start=100,
+        location_end=102,
+        clipping_date=datetime(2025, 3, 30, 10, 0),
+        content="Focus is ========== rare\nsecond line",
+        content_hash=generate_content_hash("Focus is ========== rare\nsecond line"),
+    )
+    assert (bookmark.clipping_type, bookmark.content, bookmark.content_hash) == ("Bookmark", None, None)
+    assert (bookmark.location_start, bookmark.location_end) == (2090, 2093)
+    assert (note.book_title, note.author, note.page, note.location) == ("Notes Book", None, "12", None)
+
+def test_crlf_file_parses_like_lf(make_entry, write_clippings):
+    entries = [
+        make_entry("Deep Work", "Cal Newport", content="line one\nline two"),
+        make_entry("Deep Work", "Cal Newport", "Note", location="150", content="a note"),
+    ]
+    lf_clippings = parse_clippings_file(write_clippings(*entries))
+    crlf_clippings = parse_clippings_file(write_clippings(*entries, newline="\r\n"))
+
+    assert crlf_clippings == lf_clippings
+    assert crlf_clippings[0].content == "line one\nline two"
+
+def test_whitespace_only_author_is_no_author(make_entry, write_clippings):
+    path = write_clippings(make_entry("Book", " "))
+    assert parse_clippings_file(path)[0].author is None
+
+def test_partial_trailing_entry_is_not_parsed(make_entry, write_clippings):
+    complete = make_entry("Deep Work", "Cal Newport")
+    path = write_clippings(complete, "Deep Work (Cal Newport)\n- Your Highlight on Loc")
+
+    assert len(parse_clippings_file(path)) == 1
+    # The watermark sits right after the delimiter, before its line break
+    assert find_last_entry_end(path) == len(complete.encode("utf-8")) - 1
+
+def test_iter_clippings_resumes_from_offset(make_entry, write_clippings):
+    first = make_entry("Deep Work", "Cal Newport", content="first")
+    second = make_entry("Deep Work", "Cal Newport", location="200-201", content="second")
+    path = write_clippings(first, second)
+
+    clippings = list(iter_clippings(path, start_offset=len(first.encode("utf-8"))))
+    assert [c.content for c in clippings] == ["second"]
+
+def test_empty_file_yields_nothing(write_clippings):
+    assert parse_clippings_file(write_clippings()) == []
+
+def test_parallel_parse_matches_serial(make_entry, write_clippings, monkeypatch):
+    path = write_clippings(*(
+        make_entry(f"Book {i % 7}", f"Author {i % 3}", location=str(i), content=f"Text {i}")
+        for i in range(300)
+    ))
+    serial = parse_clippings_file(path)
+
+    monkeypatch.setattr(parser, "PARALLEL_PARSE_MIN_BYTES", 0)
+    monkeypatch.setattr(parser.os, "cpu_count", lambda: 2)
+    assert parse_clippings_file(path) == serial
+
+def test_parse_error_is_not_masked_by_buffer_release(make_entry, write_clippings, monkeypatch):
+    path = write_clippings(*(make_entry("Deep Work", "Cal Newport", location=str(i)) for i in range(5)))
+
+    def fail(*args):
+        raise RuntimeError("parse failed")
+    monkeypatch.setattr(parser, "parse_entry_bytes", fail)
+
+    with pytest.raises(RuntimeError, match="parse failed"):
+        list(iter_clippings(path))
+
+@pytest.mark.parametrize("date_str, expected", [
+    ("Sunday, March 30, 2025 12:00:00 AM", datetime(2025, 3, 30, 0, 0, 0)),
+    ("Sunday, March 30, 2025 12:59:59 AM", datetime(2025, 3, 30, 0, 59, 59)),
+    ("Sunday, March 30, 2025 12:00:00 PM", datetime(2025, 3, 30, 12, 0, 0)),
+    ("Sunday, March 30, 2025 1:05:00 PM", datetime(2025, 3, 30, 13, 5, 0)),
+    ("Sunday, March 30, 2025 11:59:59 PM", datetime(2025, 3, 30, 23, 59, 59)),
+    ("Monday, 31 March 2025 23:15:30", datetime(2025, 3, 31, 23, 15, 30)),
+    ("Monday, 31 March 2025 11:15:30 pm", datetime(2025, 3, 31, 23, 15, 30)),
+])
+def test_parse_kindle_date(date_str, expected):
+    assert parse_kindle_date(date_str) == expected
+
+@pytest.mark.parametrize("date_str", [
+    "Sunday, March 30, 2025 0:30:00 AM", # Hour out of range for a 12-hour clock
+    "Sunday, Mar 30, 2025 10:00:00 AM", # Abbreviated month name
+])
+def test_parse_kindle_date_falls_back_to_dateutil(date_str):
+    # The pattern matches, but the fast datetime builder declines the values
+    assert parser._datetime_from_match(parser.KINDLE_DATE_PATTERN.match(date_str)) is None
+    assert parse_kindle_date(date_str) == parse_date(date_str)
+
+def test_parse_kindle_date_rejects_invalid_date():
+    with pytest.raises(ValueError):
+        parse_kindle_date("Sunday, March 30, 2025 13:05:00 PM")
+
+@pytest.mark.parametrize("location, expected", [
+    ("1234-45", (1234, 1245)),
+    ("100-105", (100, 105)),
+    ("998-1002", (998, 1002)),
+    ("300", (300, None)),
+    (None, (None, None)),
+    ("", (None, None)),
+    ("12a-14", (None, None)),
+])
+def test_parse_location_range(location, expected):
+    assert parse_location_range(location) == expected